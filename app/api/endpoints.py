@@ -1,19 +1,28 @@
 # app/api/endpoints.py
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import List, Optional
 import asyncio
+import orjson
 
 from app.models.schemas import (
-    GeocodeRequest, GeocodeResponse,
-    ServiceSearchRequest, ServiceSearchResponse, ServiceLocation,
+    GeocodeRequest, GeocodeResponse, BatchGeocodeRequest,
+    ServiceSearchRequest, ServiceSearchResponse, ServiceLocation, ServiceType,
     DemographicsRequest, DemographicsResponse,
     RouteRequest, RouteResponse,
     Location, ErrorResponse
 )
-from app.services.geocoding import geocoding_service
+from app.services.geocoding import GeocodingService
 
 router = APIRouter()
 
+# Batches at least this large are converted to plain dicts off the event loop
+BATCH_OFFLOAD_THRESHOLD = 200
+
+def get_geocoder(request: Request) -> GeocodingService:
+    """Return the GeocodingService created by the application lifespan"""
+    return request.app.state.geocoder
+
 # Health check endpoint
 @router.get("/health")
 async def health_check():
@@ -21,12 +30,12 @@ async def health_check():
 
 # Geocoding endpoints
 @router.post("/geocode", response_model=GeocodeResponse, tags=["Geocoding"])
-async def geocode_address(request: GeocodeRequest):
+async def geocode_address(request: GeocodeRequest, geocoder: GeocodingService = Depends(get_geocoder)):
     """
     Convert an address into geographic coordinates
     """
     try:
-        result = await geocoding_service.geocode_address(
+        result = await geocoder.geocode_address(
             address=request.address,
             country=request.country
         )
@@ -37,13 +46,14 @@ async def geocode_address(request: GeocodeRequest):
 @router.get("/geocode", response_model=GeocodeResponse, tags=["Geocoding"])
 async def geocode_address_get(
     address: str = Query(..., description="Address to geocode"),
-    country: str = Query("USA", description="Country context")
+    country: str = Query("USA", description="Country context"),
+    geocoder: GeocodingService = Depends(get_geocoder)
 ):
     """
     Convert an address into geographic coordinates (GET version)
     """
     try:
-        result = await geocoding_service.geocode_address(
+        result = await geocoder.geocode_address(
             address=address,
             country=country
         )
@@ -54,21 +64,22 @@ async def geocode_address_get(
 @router.get("/reverse-geocode", tags=["Geocoding"])
 async def reverse_geocode(
     lat: float = Query(..., ge=-90, le=90, description="Latitude"),
-    lon: float = Query(..., ge=-180, le=180, description="Longitude")
+    lon: float = Query(..., ge=-180, le=180, description="Longitude"),
+    geocoder: GeocodingService = Depends(get_geocoder)
 ):
     """
     Convert coordinates into address information
 
     """
     try:
-        result = await geocoding_service.reverse_geocode(latitude=lat, longitude=lon)
+        result = await geocoder.reverse_geocode(latitude=lat, longitude=lon)
         return {"location": {"latitude": lat, "longitude": lon}, "address": result}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Service discovery endpoints
 @router.post("/services/search", response_model=ServiceSearchResponse, tags=["Services"])
-async def search_services(request: ServiceSearchRequest):
+async def search_services(request: ServiceSearchRequest, geocoder: GeocodingService = Depends(get_geocoder)):
     """
     Find nearby services (hospitals, restaurants, etc.)
     
@@ -80,7 +91,7 @@ async def search_services(request: ServiceSearchRequest):
     """
     try:
         # Search for places using Esri geocoding service
-        places = await geocoding_service.search_places(
+        places = await geocoder.search_places(
             latitude=request.latitude,
             longitude=request.longitude,
             category=request.service_type.value,
@@ -123,7 +134,8 @@ async def find_nearest_services(
     lon: float = Query(..., ge=-180, le=180),
     service_type: str = Query(..., description="hospital, pharmacy, restaurant, etc."),
     radius_miles: float = Query(5.0, gt=0, le=50, description="Search radius in miles"),
-    limit: int = Query(10, ge=1, le=50)
+    limit: int = Query(10, ge=1, le=50),
+    geocoder: GeocodingService = Depends(get_geocoder)
 ):
     """
     Find the nearest services of a specific type
@@ -135,7 +147,7 @@ async def find_nearest_services(
     """
     try:
         # Search for places using Esri geocoding service
-        places = await geocoding_service.search_places(
+        places = await geocoder.search_places(
             latitude=lat,
             longitude=lon,
             category=service_type,
@@ -227,48 +239,119 @@ async def analyze_service_area(
 
 # Batch processing endpoints
 @router.post("/batch/geocode", tags=["Batch"])
-async def batch_geocode(addresses: List[str]):
+async def batch_geocode(request: BatchGeocodeRequest, geocoder: GeocodingService = Depends(get_geocoder)):
     """
     Geocode multiple addresses at once
     
     """
     try:
-        results = await geocoding_service.batch_geocode(addresses)
-        return {"results": results, "total_processed": len(addresses)}
+        results = await geocoder.batch_geocode(request.addresses, country=request.country)
+        if len(results) < BATCH_OFFLOAD_THRESHOLD:
+            return {"results": results, "total_processed": len(request.addresses)}
+        
+        # Keep the loop free for other requests while a large batch is converted
+        payload = await asyncio.to_thread(lambda: [r.model_dump() for r in results])
+        return ORJSONResponse({"results": payload, "total_processed": len(request.addresses)})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/batch/geocode/stream", tags=["Batch"])
+async def batch_geocode_stream(request: BatchGeocodeRequest, geocoder: GeocodingService = Depends(get_geocoder)):
+    """
+    Geocode multiple addresses, streaming each result as soon as it is ready
+    
+    Responds with newline-delimited JSON, one `{"index": i, "result": GeocodeResponse}`
+    line per address in completion order, where `index` is the address's position in the request.
+    With an ArcGIS API key, results arrive a geocodeAddresses chunk at a time.
+    """
+    async def result_lines():
+        async for index, result in geocoder.iter_batch_geocode(request.addresses, country=request.country):
+            yield orjson.dumps({"index": index, "result": result.model_dump()}) + b"\n"
+    
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
 # Example/demo endpoints
+async def _analyze_nearby(
+    geocoder: GeocodingService,
+    address: str,
+    categories: List[str],
+    radius_miles: float = 5.0
+) -> dict:
+    """
+    Geocode an address, then search every category around it concurrently
+    """
+    geocoded = await geocoder.geocode_address(address)
+    lat, lon = geocoded.location.latitude, geocoded.location.longitude
+    
+    # The searches only depend on the geocoded point, so run them side by side;
+    # dict.fromkeys drops repeated categories (e.g. competitor_type=bank) so each is searched once
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = {
+                category: tg.create_task(geocoder.search_places(lat, lon, category, radius_miles))
+                for category in dict.fromkeys(categories)
+            }
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0]
+    
+    return {
+        "location": geocoded,
+        "radius_miles": radius_miles,
+        "nearby": {category: task.result() for category, task in tasks.items()},
+        "demographics": {}  # Would be populated by Esri GeoEnrichment Service
+    }
+
 @router.get("/examples/healthcare-access", tags=["Examples"])
-async def healthcare_access_example():
+async def healthcare_access_example(
+    address: Optional[str] = Query(None, description="Address to analyze; omit to describe the example"),
+    geocoder: GeocodingService = Depends(get_geocoder)
+):
     """
     Example: Analyze healthcare accessibility for a location
     
     Combines geocoding + nearest hospitals + demographics
     """
-    return {
-        "example": "Healthcare Access Analysis",
-        "description": "Find nearest hospitals and analyze population demographics",
-        "sample_request": {
-            "address": "123 Main St, Rochester, NY",
-            "analysis": ["geocode", "find_hospitals", "get_demographics"]
-        },
-        "business_value": "Identify healthcare service gaps and underserved areas"
-    }
+    if address is None:
+        return {
+            "example": "Healthcare Access Analysis",
+            "description": "Find nearest hospitals and analyze population demographics",
+            "sample_request": {
+                "address": "123 Main St, Rochester, NY",
+                "analysis": ["geocode", "find_hospitals", "get_demographics"]
+            },
+            "business_value": "Identify healthcare service gaps and underserved areas"
+        }
+    
+    try:
+        analysis = await _analyze_nearby(geocoder, address, ["hospital", "pharmacy"])
+        return {"example": "Healthcare Access Analysis", **analysis}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/examples/retail-site-selection", tags=["Examples"])  
-async def retail_site_selection_example():
+async def retail_site_selection_example(
+    address: Optional[str] = Query(None, description="Address to analyze; omit to describe the example"),
+    competitor_type: ServiceType = Query(ServiceType.RESTAURANT, description="Type of competing business"),
+    geocoder: GeocodingService = Depends(get_geocoder)
+):
     """
     Example: Retail location analysis
     
     Combines demographics + competitors + drive time analysis
     """
-    return {
-        "example": "Retail Site Selection",
-        "description": "Analyze potential retail locations",
-        "sample_request": {
-            "address": "Downtown Rochester, NY",  
-            "analysis": ["demographics", "competitors", "drive_time_analysis"]
-        },
-        "business_value": "Optimize store placement and predict revenue potential"
-    }
+    if address is None:
+        return {
+            "example": "Retail Site Selection",
+            "description": "Analyze potential retail locations",
+            "sample_request": {
+                "address": "Downtown Rochester, NY",  
+                "analysis": ["demographics", "competitors", "drive_time_analysis"]
+            },
+            "business_value": "Optimize store placement and predict revenue potential"
+        }
+    
+    try:
+        analysis = await _analyze_nearby(geocoder, address, [competitor_type.value, "gas_station", "bank"])
+        return {"example": "Retail Site Selection", **analysis}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
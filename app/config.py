@@ -19,10 +19,13 @@ class Settings(BaseSettings):
     
     # Rate limiting
     max_requests_per_minute: int = 60
+    geocode_concurrency: int = 16  # max in-flight Esri requests per batch
+    geocode_rps: int = 20  # max Esri requests per second per process
     
     # Cache settings
     enable_cache: bool = True
     cache_ttl_seconds: int = 3600  # 1 hour
+    redis_url: Optional[str] = None  # e.g. redis://localhost:6379/0, shares the geocode cache across workers
     
     class Config:
         env_file = ".env"
@@ -1,27 +1,59 @@
 # app/main.py
 import logging
+import logging.handlers
+import queue
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api.endpoints import router
 from app.config import settings
+from app.services.geocoding import GeocodingService
+
+# Configure logging: request handlers only enqueue records; a background
+# listener thread does the formatting and the console/file writes
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(log_formatter)
+# Appends only, so several uvicorn workers can share the file; rotate it
+# externally (e.g. logrotate), the handler reopens it when it is moved
+file_handler = logging.handlers.WatchedFileHandler('location_api.log', delay=True)
+file_handler.setFormatter(log_formatter)
+
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, stream_handler, file_handler)
+
+# Message-only formatter so records are not formatted twice (basicConfig would add its default)
+queue_handler = logging.handlers.QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))
 
-# Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('location_api.log')
-    ]
+    handlers=[queue_handler]
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create the geocoding client on the running loop and close it on shutdown
+    log_listener.start()
+    geocoder = GeocodingService()
+    app.state.geocoder = geocoder
+    try:
+        await geocoder.warm_up()
+        yield
+    finally:
+        await geocoder.close()
+        log_listener.stop()
+
 app = FastAPI(
     title="Location Intelligence API",
     description="A GIS API for location-based business intelligence using Esri services",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -1,5 +1,5 @@
 # app/models/schemas.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
 from enum import Enum
 
@@ -13,28 +13,36 @@ class ServiceType(str, Enum):
     POLICE = "police"
     FIRE_STATION = "fire_station"
 
-class Location(BaseModel):
+class FrozenModel(BaseModel):
+    """Immutable base model; unknown fields are ignored"""
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+class Location(FrozenModel):
     latitude: float = Field(..., ge=-90, le=90, description="Latitude coordinate")
     longitude: float = Field(..., ge=-180, le=180, description="Longitude coordinate")
     address: Optional[str] = Field(None, description="Human-readable address")
 
-class GeocodeRequest(BaseModel):
+class GeocodeRequest(FrozenModel):
     address: str = Field(..., min_length=1, description="Address to geocode")
     country: Optional[str] = Field("USA", description="Country for geocoding context")
 
-class GeocodeResponse(BaseModel):
+class GeocodeResponse(FrozenModel):
     location: Location
     confidence: float = Field(..., ge=0, le=100, description="Geocoding confidence score")
     match_type: str = Field(..., description="Type of match (exact, approximate, etc.)")
 
-class ServiceSearchRequest(BaseModel):
+class BatchGeocodeRequest(FrozenModel):
+    addresses: List[str] = Field(..., min_length=1, description="Addresses to geocode")
+    country: Optional[str] = Field("USA", description="Country for geocoding context")
+
+class ServiceSearchRequest(FrozenModel):
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
     service_type: ServiceType
     radius_miles: float = Field(5.0, gt=0, le=50, description="Search radius in miles")
     limit: int = Field(10, gt=0, le=50, description="Maximum number of results")
 
-class ServiceLocation(BaseModel):
+class ServiceLocation(FrozenModel):
     name: str
     address: str
     location: Location
@@ -43,19 +51,19 @@ class ServiceLocation(BaseModel):
     rating: Optional[float] = Field(None, ge=0, le=5)
     categories: List[str] = []
 
-class ServiceSearchResponse(BaseModel):
+class ServiceSearchResponse(FrozenModel):
     search_location: Location
     service_type: ServiceType
     results: List[ServiceLocation]
     total_found: int
     search_radius_miles: float
 
-class DemographicsRequest(BaseModel):
+class DemographicsRequest(FrozenModel):
     latitude: float = Field(..., ge=-90, le=90)
     longitude: float = Field(..., ge=-180, le=180)
     radius_miles: float = Field(1.0, gt=0, le=10, description="Analysis radius in miles")
 
-class Demographics(BaseModel):
+class Demographics(FrozenModel):
     total_population: Optional[int] = None
     median_age: Optional[float] = None
     median_income: Optional[int] = None
@@ -66,18 +74,18 @@ class Demographics(BaseModel):
     race_hispanic_percent: Optional[float] = None
     race_asian_percent: Optional[float] = None
 
-class DemographicsResponse(BaseModel):
+class DemographicsResponse(FrozenModel):
     location: Location
     radius_miles: float
     demographics: Demographics
     data_vintage: Optional[str] = None
 
-class RouteRequest(BaseModel):
+class RouteRequest(FrozenModel):
     origin: Location
     destination: Location
     travel_mode: str = Field("driving", description="Travel mode: driving, walking, transit")
 
-class RouteResponse(BaseModel):
+class RouteResponse(FrozenModel):
     origin: Location
     destination: Location
     distance_miles: float
@@ -85,7 +93,7 @@ class RouteResponse(BaseModel):
     travel_mode: str
     route_geometry: Optional[Dict[str, Any]] = None  # GeoJSON geometry
 
-class ErrorResponse(BaseModel):
+class ErrorResponse(FrozenModel):
     error: str
     message: str
     status_code: int
@@ -0,0 +1,25 @@
+# app/services/_geo_kernels.py
+import numpy as np
+
+# Mean Earth radius in miles, used for great-circle distances
+EARTH_RADIUS_MILES = 3958.8
+
+def haversine_miles(lat0: float, lon0: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Great-circle distance in miles from one point to many points
+    
+    Args:
+        lat0: Origin latitude in degrees
+        lon0: Origin longitude in degrees
+        lats: Contiguous float64 array of target latitudes in degrees
+        lons: Contiguous float64 array of target longitudes in degrees
+        
+    Returns:
+        float64 array of distances in miles, one per target
+    """
+    lat0_rad = np.radians(lat0)
+    lats_rad = np.radians(lats)
+    dlat = lats_rad - lat0_rad
+    dlon = np.radians(lons - lon0)
+    a = np.sin(dlat * 0.5) ** 2 + np.cos(lat0_rad) * np.cos(lats_rad) * np.sin(dlon * 0.5) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(a))
@@ -1,20 +1,230 @@
 # app/services/geocoding.py
+import asyncio
+import hashlib
 import httpx
-import json
 import logging
-from typing import Dict, Any, Optional
+import numpy as np
+import orjson
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+from heapq import nlargest
+from operator import itemgetter
+from types import MappingProxyType
+from typing import AsyncIterator, Coroutine, Dict, Any, Iterable, Optional
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+from pydantic import ValidationError
+from tenacity import AsyncRetrying, RetryCallState, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from app.models.schemas import GeocodeResponse, Location
 from app.config import settings, ESRI_FREE_SERVICES
+from app.services._geo_kernels import haversine_miles
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# geocodeAddresses batch limits, used until the locator reports its own
+ESRI_MAX_BATCH_SIZE = 1000
+ESRI_SUGGESTED_BATCH_SIZE = 150
+
+# Map common categories to Esri categories
+_CATEGORY_MAPPING = MappingProxyType({
+    "hospital": "Hospital",
+    "pharmacy": "Pharmacy",
+    "restaurant": "Food",
+    "gas_station": "Gas Station",
+    "school": "School",
+    "bank": "Bank",
+    "police": "Police Station",
+    "fire_station": "Fire Station"
+})
+
+# Connect/read timeout for the shared Redis cache, so an unreachable cache is a fast miss
+REDIS_TIMEOUT_SECONDS = 0.5
+
+# Longest Retry-After delay honored before retrying a throttled request
+MAX_RETRY_AFTER_SECONDS = 30.0
+
+_backoff = wait_exponential_jitter(initial=0.5, max=8.0)
+
+def _is_retryable_error(error: BaseException) -> bool:
+    """Retry network failures, throttling (429) and Esri 5xx responses, never other 4xx client errors"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
+
+def _is_retryable_post_error(error: BaseException) -> bool:
+    """
+    Retry a POST only when Esri cannot have processed it
+    
+    geocodeAddresses is billed per record, and a read timeout usually means the batch
+    was already geocoded, so only connection failures, 429 and 503 are retried.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in (429, 503)
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Honor Esri's Retry-After header when present, otherwise back off exponentially with jitter"""
+    error = retry_state.outcome.exception()
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(max(float(retry_after), 0.0), MAX_RETRY_AFTER_SECONDS)
+            except ValueError:
+                pass  # HTTP-date form; fall back to backoff
+    return _backoff(retry_state)
+
+async def _iter_completed(coros: Iterable[Coroutine[Any, Any, Any]]) -> AsyncIterator[Any]:
+    """Run coros as tasks and yield their results in completion order"""
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Stop outstanding work if the consumer goes away early
+        for task in tasks:
+            task.cancel()
+
 class GeocodingService:
     """Service for address geocoding using Esri World Geocoding Service"""
     
     def __init__(self):
         self.base_url = ESRI_FREE_SERVICES["world_geocoding"]
-        self.client = httpx.AsyncClient(timeout=30.0)
+        # Long-lived pooled client: HTTP/2 multiplexes concurrent calls to the
+        # single Esri host and keepalive avoids repeated TLS handshakes. No
+        # custom transport, so HTTP(S)_PROXY/NO_PROXY from the environment
+        # still apply; _request retries failed connections.
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=5.0, read=25.0, write=10.0, pool=5.0),
+            http2=True,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100, keepalive_expiry=60.0),
+            headers={"User-Agent": f"LocationIntelligenceAPI/{settings.api_version}"}
+        )
+        
+        # Fixed request parameters and URLs, built once; calls only add per-request fields
+        base_params = {"f": "json"}
+        if settings.arcgis_api_key:
+            base_params["token"] = settings.arcgis_api_key
+        self._geocode_base = {**base_params, "outFields": "Addr_type,Score,Match_addr", "maxLocations": 1}
+        self._reverse_base = {**base_params, "outFields": "Addr_type,Match_addr,StAddr,City,RegionAbbr,Postal"}
+        self._base_params = base_params
+        self._find_candidates_url = f"{self.base_url}/findAddressCandidates"
+        self._reverse_url = f"{self.base_url}/reverseGeocode"
+        self._batch_base = {**base_params, "outFields": "Addr_type,Match_addr,Status"}
+        self._batch_url = f"{self.base_url}/geocodeAddresses"
+        
+        # In-memory LRU+TTL cache of Esri responses (None when caching is disabled)
+        self._cache: Optional[TTLCache] = (
+            TTLCache(maxsize=10_000, ttl=settings.cache_ttl_seconds)
+            if settings.enable_cache else None
+        )
+        # Optional Redis cache of geocoding results shared by all workers
+        self._redis: Optional[aioredis.Redis] = (
+            aioredis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=REDIS_TIMEOUT_SECONDS,
+                socket_timeout=REDIS_TIMEOUT_SECONDS
+            )
+            if settings.enable_cache and settings.redis_url else None
+        )
+        # Token bucket keeping outbound requests under Esri's per-second rate limit
+        self._limiter = AsyncLimiter(settings.geocode_rps or 20, 1.0)
+        # Records per geocodeAddresses request, read from the locator on first batch
+        self._batch_size: Optional[int] = None
+    
+    def _cache_get(self, key: tuple) -> Any:
+        """Return the cached value for key, or None on miss / disabled cache"""
+        if self._cache is None:
+            return None
+        return self._cache.get(key)
+    
+    def _cache_set(self, key: tuple, value: Any) -> None:
+        """Store value under key when caching is enabled"""
+        if self._cache is not None:
+            self._cache[key] = value
+    
+    @staticmethod
+    def _geocode_cache_key(address: str, country: Optional[str]) -> tuple:
+        """Build the cache key for a geocoding request, ignoring case and extra whitespace"""
+        return ("geocode", " ".join(address.split()).casefold(), (country or "").upper())
+    
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request to Esri, retrying transient failures with jittered exponential backoff
+        
+        GETs retry any network failure or 5xx; POSTs only retry errors where the request was never processed.
+        
+        Raises:
+            httpx.HTTPError: When the last attempt fails or Esri returns a non-retryable error
+        """
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(4),
+            wait=_retry_wait,
+            retry=retry_if_exception(_is_retryable_error if method == "GET" else _is_retryable_post_error),
+            reraise=True
+        ):
+            with attempt:
+                async with self._limiter:
+                    response = await self.client.request(method, url, **kwargs)
+                response.raise_for_status()
+        return response
+    
+    async def _shared_cache_get(self, cache_key: tuple) -> Optional[GeocodeResponse]:
+        """Look up a geocoding result in the shared Redis cache"""
+        return (await self._shared_cache_get_many([cache_key]))[0]
+    
+    async def _shared_cache_get_many(self, cache_keys: list[tuple]) -> list[Optional[GeocodeResponse]]:
+        """Look up several geocoding results in the shared Redis cache with one MGET"""
+        if self._redis is None or not cache_keys:
+            return [None] * len(cache_keys)
+        try:
+            values = await self._redis.mget([self._shared_cache_key(key) for key in cache_keys])
+        except RedisError as e:
+            logger.warning("Shared cache read failed: %s", e)
+            return [None] * len(cache_keys)
+        
+        results = []
+        for cached in values:
+            try:
+                results.append(GeocodeResponse.model_validate_json(cached) if cached else None)
+            except ValidationError as e:
+                # Stale or corrupt entry; treat it as a miss and let the fresh result overwrite it
+                logger.warning("Ignoring invalid shared cache entry: %s", e)
+                results.append(None)
+        return results
+    
+    async def _shared_cache_set(self, cache_key: tuple, result: GeocodeResponse) -> None:
+        """Store a geocoding result in the shared Redis cache"""
+        await self._shared_cache_set_many([(cache_key, result)])
+    
+    async def _shared_cache_set_many(self, items: list[tuple[tuple, GeocodeResponse]]) -> None:
+        """Store several geocoding results in the shared Redis cache in one pipelined round trip"""
+        if self._redis is None or not items:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for cache_key, result in items:
+                    pipe.set(self._shared_cache_key(cache_key), result.model_dump_json(), ex=settings.cache_ttl_seconds)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Shared cache write failed: %s", e)
+    
+    @staticmethod
+    def _shared_cache_key(cache_key: tuple) -> bytes:
+        """Fixed-size Redis key derived from the in-memory cache key"""
+        digest = hashlib.blake2b("|".join(cache_key[1:]).encode(), digest_size=16).digest()
+        return b"geo:" + digest
+    
+    @staticmethod
+    def _failed_response(address: str) -> GeocodeResponse:
+        """Placeholder result for an address that could not be geocoded"""
+        return GeocodeResponse(
+            location=Location(latitude=0, longitude=0, address=address),
+            confidence=0.0,
+            match_type="Failed"
+        )
     
     async def geocode_address(self, address: str, country: str = "USA") -> GeocodeResponse:
         """
@@ -27,36 +237,36 @@ class GeocodingService:
         Returns:
             GeocodeResponse with location and metadata
         """
+        cache_key = self._geocode_cache_key(address, country)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            logger.debug("Cache hit for geocode: %s", address)
+            return cached
+        
+        cached = await self._shared_cache_get(cache_key)
+        if cached is not None:
+            logger.debug("Shared cache hit for geocode: %s", address)
+            self._cache_set(cache_key, cached)
+            return cached
+        
         try:
             # Prepare request parameters
-            params = {
-                "singleLine": address,
-                "f": "json",
-                "outFields": "Addr_type,Score,Match_addr",
-                "maxLocations": 1,
-                "countryCode": country
-            }
-            
-            # Add API key if available
-            if settings.arcgis_api_key:
-                params["token"] = settings.arcgis_api_key
-            
-            url = f"{self.base_url}/findAddressCandidates"
-            logger.info(f"Geocoding request: {address} (country: {country})")
-            logger.debug(f"URL: {url}")
-            logger.debug(f"Params: {params}")
+            params = {**self._geocode_base, "singleLine": address, "countryCode": country}
+            url = self._find_candidates_url
+            logger.info("Geocoding request: %s (country: %s)", address, country)
+            logger.debug("URL: %s", url)
+            logger.debug("Params: %s", params)
             
             # Make request to Esri Geocoding Service
-            response = await self.client.get(url, params=params)
-            logger.info(f"Response status: {response.status_code}")
+            response = await self._request("GET", url, params=params)
+            logger.debug("Response status: %s", response.status_code)
             
-            response.raise_for_status()
-            data = response.json()
-            logger.debug(f"Response data: {json.dumps(data, indent=2)}")
+            data = orjson.loads(response.content)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response data: %s", orjson.dumps(data).decode())
             
             if not data.get("candidates"):
-                logger.warning(f"No geocoding results found for address: {address}")
-                logger.debug(f"Full response: {json.dumps(data, indent=2)}")
+                logger.warning("No geocoding results found for address: %s", address)
                 raise ValueError(f"No geocoding results found for address: {address}")
             
             # Get best candidate
@@ -64,10 +274,13 @@ class GeocodingService:
             location_data = candidate["location"]
             attributes = candidate.get("attributes", {})
             
-            logger.info(f"Geocoded '{address}' -> lat: {location_data['y']:.4f}, lon: {location_data['x']:.4f}")
-            logger.info(f"Confidence: {candidate.get('score', 0.0)}, Match type: {attributes.get('Addr_type', 'Unknown')}")
+            logger.debug(
+                "Geocoded '%s' -> lat: %.4f, lon: %.4f (confidence: %s, match type: %s)",
+                address, location_data["y"], location_data["x"],
+                candidate.get("score", 0.0), attributes.get("Addr_type", "Unknown")
+            )
             
-            return GeocodeResponse(
+            result = GeocodeResponse(
                 location=Location(
                     latitude=location_data["y"],
                     longitude=location_data["x"],
@@ -76,22 +289,27 @@ class GeocodingService:
                 confidence=candidate.get("score", 0.0),
                 match_type=attributes.get("Addr_type", "Unknown")
             )
+            self._cache_set(cache_key, result)
+            await self._shared_cache_set(cache_key, result)
+            return result
             
+        except httpx.HTTPStatusError as e:
+            logger.error("HTTP Error: %s", e)
+            logger.error("Response status: %s", e.response.status_code)
+            logger.error("Response text: %s", e.response.text)
+            raise Exception(f"Geocoding service HTTP error: {str(e)}")
         except httpx.HTTPError as e:
-            logger.error(f"HTTP Error: {str(e)}")
-            logger.error(f"Response status: {getattr(e.response, 'status_code', 'N/A')}")
-            logger.error(f"Response text: {getattr(e.response, 'text', 'N/A')}")
+            # Transport errors (connect failures, timeouts) have no response to log
+            logger.error("HTTP Error: %s", e)
             raise Exception(f"Geocoding service HTTP error: {str(e)}")
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON Decode Error: {str(e)}")
+        except orjson.JSONDecodeError as e:
+            logger.error("JSON Decode Error: %s", e)
             raise Exception(f"Invalid JSON response from geocoding service: {str(e)}")
         except ValueError as e:
-            logger.error(f"Value Error: {str(e)}")
+            logger.error("Value Error: %s", e)
             raise e  # Re-raise ValueError as-is
         except Exception as e:
-            logger.error(f"Unexpected Error: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("Geocoding failed with unexpected error")
             raise Exception(f"Geocoding failed with unexpected error: {str(e)}")
     
     async def reverse_geocode(self, latitude: float, longitude: float) -> Dict[str, Any]:
@@ -105,27 +323,22 @@ class GeocodingService:
         Returns:
             Dictionary with address information
         """
+        cache_key = ("reverse", round(latitude, 5), round(longitude, 5))
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            params = {
-                "location": f"{longitude},{latitude}",
-                "f": "json",
-                "outFields": "Addr_type,Match_addr,StAddr,City,RegionAbbr,Postal"
-            }
+            params = {**self._reverse_base, "location": f"{longitude},{latitude}"}
             
-            if settings.arcgis_api_key:
-                params["token"] = settings.arcgis_api_key
+            response = await self._request("GET", self._reverse_url, params=params)
             
-            response = await self.client.get(
-                f"{self.base_url}/reverseGeocode",
-                params=params
-            )
-            response.raise_for_status()
-            
-            data = response.json()
+            data = orjson.loads(response.content)
             
             if "address" not in data:
                 raise ValueError(f"No address found for coordinates: {latitude}, {longitude}")
             
+            self._cache_set(cache_key, data["address"])
             return data["address"]
             
         except httpx.HTTPError as e:
@@ -133,30 +346,185 @@ class GeocodingService:
         except Exception as e:
             raise Exception(f"Reverse geocoding failed: {str(e)}")
     
-    async def batch_geocode(self, addresses: list[str]) -> list[GeocodeResponse]:
+    async def batch_geocode(self, addresses: list[str], country: str = "USA") -> list[GeocodeResponse]:
         """
         Geocode multiple addresses in batch
         
         Args:
             addresses: List of address strings
+            country: Country context for geocoding
             
         Returns:
             List of GeocodeResponse objects
         """
-        # For now, process sequentially - could be optimized with Esri batch service
-        results = []
-        for address in addresses:
+        results: list[Optional[GeocodeResponse]] = [None] * len(addresses)
+        async for index, result in self.iter_batch_geocode(addresses, country):
+            results[index] = result
+        
+        failed = sum(1 for result in results if result.match_type == "Failed")
+        logger.info("Batch geocoded %d addresses (%d failed)", len(results), failed)
+        return results
+    
+    async def iter_batch_geocode(
+        self, addresses: list[str], country: str = "USA"
+    ) -> AsyncIterator[tuple[int, GeocodeResponse]]:
+        """
+        Geocode addresses concurrently, yielding results as they complete
+        
+        With an API key, cached results are yielded first and only the remaining addresses
+        are sent in geocodeAddresses chunks, each chunk's results yielded together once its
+        request returns; without one, every address is a separate findAddressCandidates request.
+        
+        Args:
+            addresses: List of address strings
+            country: Country context for geocoding
+            
+        Yields:
+            (index into addresses, GeocodeResponse) pairs in completion order
+        """
+        # Esri's batch endpoint requires a token, and a lone address is cheaper as a plain request
+        if not settings.arcgis_api_key or len(addresses) == 1:
+            semaphore = asyncio.Semaphore(settings.geocode_concurrency or 16)
+            lookups = (self._geocode_one(i, a, country, semaphore) for i, a in enumerate(addresses))
+            async for pair in _iter_completed(lookups):
+                yield pair
+            return
+        
+        # Serve cached results first (in-memory, then Redis); batch requests are billed per record
+        cache_keys = [self._geocode_cache_key(address, country) for address in addresses]
+        misses = []
+        for index, cache_key in enumerate(cache_keys):
+            cached = self._cache_get(cache_key)
+            if cached is None:
+                misses.append(index)
+            else:
+                yield index, cached
+        
+        shared = await self._shared_cache_get_many([cache_keys[i] for i in misses])
+        remaining = []
+        for index, cached in zip(misses, shared):
+            if cached is None:
+                remaining.append(index)
+            else:
+                self._cache_set(cache_keys[index], cached)
+                yield index, cached
+        if not remaining:
+            return
+        
+        batch_size = await self._get_batch_size()
+        semaphore = asyncio.Semaphore(settings.geocode_concurrency or 16)
+        # One limit for the per-address fallbacks of all failed chunks together
+        fallback_semaphore = asyncio.Semaphore(settings.geocode_concurrency or 16)
+        
+        async def geocode_chunk(indices: list[int]) -> list[tuple[int, GeocodeResponse]]:
+            chunk = [addresses[i] for i in indices]
+            async with semaphore:
+                try:
+                    return list(zip(indices, await self._geocode_batch_chunk(chunk, country)))
+                except (httpx.ReadTimeout, httpx.ReadError) as e:
+                    # Esri has most likely geocoded (and billed) the chunk already; don't pay for it twice
+                    logger.warning("Batch geocoding response lost, marking %d addresses failed: %s", len(chunk), e)
+                    return list(zip(indices, map(self._failed_response, chunk)))
+                except Exception as e:
+                    logger.warning("Batch geocoding request failed, geocoding individually: %s", e)
+            return list(zip(indices, await self._geocode_concurrently(chunk, country, fallback_semaphore)))
+        
+        chunks = (geocode_chunk(remaining[i:i + batch_size]) for i in range(0, len(remaining), batch_size))
+        async for chunk_results in _iter_completed(chunks):
+            for pair in chunk_results:
+                yield pair
+    
+    async def _get_batch_size(self) -> int:
+        """Records per geocodeAddresses request, from the locator's SuggestedBatchSize"""
+        if self._batch_size is not None:
+            return self._batch_size
+        
+        try:
+            response = await self._request("GET", self.base_url, params=self._base_params)
+            properties = orjson.loads(response.content).get("locatorProperties", {})
+            suggested = int(properties.get("SuggestedBatchSize", ESRI_SUGGESTED_BATCH_SIZE))
+            maximum = int(properties.get("MaxBatchSize", ESRI_MAX_BATCH_SIZE))
+        except (httpx.HTTPError, ValueError, TypeError, AttributeError) as e:
+            # Not cached, so the next batch asks the locator again
+            logger.warning("Could not read locator batch size, using %d: %s", ESRI_SUGGESTED_BATCH_SIZE, e)
+            return ESRI_SUGGESTED_BATCH_SIZE
+        
+        self._batch_size = max(1, min(suggested, maximum))
+        logger.info("Using geocodeAddresses batch size %d", self._batch_size)
+        return self._batch_size
+    
+    async def _geocode_one(
+        self, index: int, address: str, country: str, semaphore: asyncio.Semaphore
+    ) -> tuple[int, GeocodeResponse]:
+        """Geocode one address of a batch under semaphore, returning a failed result instead of raising"""
+        async with semaphore:
             try:
-                result = await self.geocode_address(address)
-                results.append(result)
-            except Exception as e:
-                # Create failed result
-                results.append(GeocodeResponse(
-                    location=Location(latitude=0, longitude=0, address=address),
-                    confidence=0.0,
-                    match_type="Failed"
-                ))
+                return index, await self.geocode_address(address, country)
+            except Exception:
+                return index, self._failed_response(address)
+    
+    async def _geocode_concurrently(
+        self, addresses: list[str], country: str = "USA", semaphore: Optional[asyncio.Semaphore] = None
+    ) -> list[GeocodeResponse]:
+        """Geocode addresses one request each, capping in-flight requests with semaphore (a new one by default)"""
+        semaphore = semaphore or asyncio.Semaphore(settings.geocode_concurrency or 16)
+        # gather preserves input order
+        pairs = await asyncio.gather(*(self._geocode_one(i, a, country, semaphore) for i, a in enumerate(addresses)))
+        return [result for _, result in pairs]
+    
+    async def _geocode_batch_chunk(self, addresses: list[str], country: str = "USA") -> list[GeocodeResponse]:
+        """
+        Geocode one batch of addresses with a single geocodeAddresses request
         
+        Args:
+            addresses: List of address strings
+            country: Country context for geocoding
+            
+        Returns:
+            List of GeocodeResponse objects in input order
+        """
+        records = {
+            "records": [
+                {"attributes": {"OBJECTID": i, "SingleLine": address}}
+                for i, address in enumerate(addresses)
+            ]
+        }
+        data = {**self._batch_base, "addresses": orjson.dumps(records).decode(), "sourceCountry": country}
+        
+        logger.info("Batch geocoding request: %d addresses", len(addresses))
+        response = await self._request("POST", self._batch_url, data=data)
+        payload = orjson.loads(response.content)
+        
+        if "error" in payload:
+            raise ValueError(f"Batch geocoding service error: {payload['error'].get('message', payload['error'])}")
+        
+        results = [self._failed_response(address) for address in addresses]
+        matched = []
+        for location in payload.get("locations", []):
+            attributes = location.get("attributes", {})
+            index = attributes.get("ResultID")
+            if index is None or not 0 <= index < len(addresses):
+                continue
+            # Unmatched records come back with Status "U" and a NaN location
+            if attributes.get("Status") == "U" or not location.get("score"):
+                continue
+            
+            address = addresses[index]
+            result = GeocodeResponse(
+                location=Location(
+                    latitude=location["location"]["y"],
+                    longitude=location["location"]["x"],
+                    address=attributes.get("Match_addr", address)
+                ),
+                confidence=location.get("score", 0.0),
+                match_type=attributes.get("Addr_type", "Unknown")
+            )
+            results[index] = result
+            cache_key = self._geocode_cache_key(address, country)
+            self._cache_set(cache_key, result)
+            matched.append((cache_key, result))
+        
+        await self._shared_cache_set_many(matched)
         return results
     
     async def search_places(
@@ -180,93 +548,102 @@ class GeocodingService:
         Returns:
             List of place dictionaries with location and details
         """
+        cache_key = (
+            "places", round(latitude, 5), round(longitude, 5),
+            category.lower(), radius_miles, limit
+        )
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Convert miles to meters for Esri API
             radius_meters = int(radius_miles * 1609.34)
             
-            # Map common categories to Esri categories
-            category_mapping = {
-                "hospital": "Hospital",
-                "pharmacy": "Pharmacy",
-                "restaurant": "Food",
-                "gas_station": "Gas Station",
-                "school": "School",
-                "bank": "Bank",
-                "police": "Police Station",
-                "fire_station": "Fire Station"
-            }
+            esri_category = _CATEGORY_MAPPING.get(category.lower(), category)
             
-            esri_category = category_mapping.get(category.lower(), category)
+            # Search box of +/-0.1 degrees around the point
+            lon_lo, lon_hi = longitude - 0.1, longitude + 0.1
+            lat_lo, lat_hi = latitude - 0.1, latitude + 0.1
             
             params = {
+                **self._base_params,
                 "text": esri_category,
                 "location": f"{longitude},{latitude}",
                 "category": esri_category,
-                "f": "json",
                 "maxLocations": limit,
-                "searchExtent": f"{longitude-0.1},{latitude-0.1},{longitude+0.1},{latitude+0.1}"
+                "searchExtent": f"{lon_lo:.6f},{lat_lo:.6f},{lon_hi:.6f},{lat_hi:.6f}"
             }
+            url = self._find_candidates_url
+            logger.info("Searching for %s near (%.4f, %.4f)", category, latitude, longitude)
+            logger.debug("URL: %s", url)
+            logger.debug("Params: %s", params)
             
-            if settings.arcgis_api_key:
-                params["token"] = settings.arcgis_api_key
-            
-            url = f"{self.base_url}/findAddressCandidates"
-            logger.info(f"Searching for {category} near ({latitude:.4f}, {longitude:.4f})")
-            logger.debug(f"URL: {url}")
-            logger.debug(f"Params: {params}")
-            
-            response = await self.client.get(url, params=params)
-            logger.info(f"Response status: {response.status_code}")
+            response = await self._request("GET", url, params=params)
+            logger.debug("Response status: %s", response.status_code)
             
-            response.raise_for_status()
-            data = response.json()
-            logger.debug(f"Response data: {json.dumps(data, indent=2)}")
+            data = orjson.loads(response.content)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response data: %s", orjson.dumps(data).decode())
             
             if not data.get("candidates"):
-                logger.warning(f"No {category} results found near ({latitude:.4f}, {longitude:.4f})")
+                logger.warning("No %s results found near (%.4f, %.4f)", category, latitude, longitude)
                 return []
             
+            candidates = data["candidates"]
+            
+            # Haversine distance from the search point to every candidate at once
+            lats = np.fromiter((c["location"]["y"] for c in candidates), dtype=np.float64, count=len(candidates))
+            lons = np.fromiter((c["location"]["x"] for c in candidates), dtype=np.float64, count=len(candidates))
+            distances = haversine_miles(latitude, longitude, lats, lons).round(2).tolist()
+            
             places = []
-            for candidate in data["candidates"]:
+            for candidate, distance_miles in zip(candidates, distances):
                 location_data = candidate["location"]
                 attributes = candidate.get("attributes", {})
                 
-                # Calculate distance (approximate)
-                import math
-                lat_diff = location_data["y"] - latitude
-                lon_diff = location_data["x"] - longitude
-                distance_miles = math.sqrt(lat_diff**2 + lon_diff**2) * 69  # Rough conversion
-                
                 place = {
                     "name": attributes.get("Place_addr", attributes.get("Match_addr", "Unknown")),
                     "address": attributes.get("Match_addr", ""),
                     "latitude": location_data["y"],
                     "longitude": location_data["x"],
-                    "distance_miles": round(distance_miles, 2),
+                    "distance_miles": distance_miles,
                     "confidence": candidate.get("score", 0.0),
                     "category": esri_category,
                     "place_type": attributes.get("Addr_type", "Unknown")
                 }
                 places.append(place)
             
-            # Sort by confidence/score
-            places.sort(key=lambda x: x["confidence"], reverse=True)
+            # Keep the top `limit` places by confidence/score
+            places = nlargest(limit, places, key=itemgetter("confidence"))
             
-            logger.info(f"Found {len(places)} {category} locations")
+            logger.info("Found %d %s locations", len(places), category)
+            self._cache_set(cache_key, places)
             return places
             
         except httpx.HTTPError as e:
-            logger.error(f"HTTP Error in place search: {str(e)}")
+            logger.error("HTTP Error in place search: %s", e)
             raise Exception(f"Place search service HTTP error: {str(e)}")
         except Exception as e:
-            logger.error(f"Unexpected Error in place search: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.exception("Place search failed with unexpected error")
             raise Exception(f"Place search failed: {str(e)}")
     
+    async def warm_up(self, timeout: float = 5.0) -> None:
+        """
+        Open a pooled connection to Esri before the first real request
+        
+        Reads the locator properties, which also caches the batch size.
+        Never raises; a slow or unreachable Esri only delays startup by `timeout`.
+        """
+        try:
+            await asyncio.wait_for(self._get_batch_size(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Esri warm-up timed out after %ss", timeout)
+        except Exception:
+            logger.warning("Esri warm-up failed", exc_info=True)
+    
     async def close(self):
-        """Close the HTTP client"""
+        """Close the HTTP client and the shared cache connection"""
         await self.client.aclose()
-
-# Global instance
-geocoding_service = GeocodingService()
\ No newline at end of file
+        if self._redis is not None:
+            await self._redis.aclose()
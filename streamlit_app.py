@@ -1,7 +1,12 @@
 import streamlit as st
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import folium
+from folium.plugins import FastMarkerCluster
 from streamlit_folium import st_folium
+import numpy as np
 import pandas as pd
 from typing import Optional, List, Dict, Any
 
@@ -15,6 +20,22 @@ st.set_page_config(
 
 # Constants
 API_BASE_URL = "http://localhost:8000/api/v1"
+MAX_INDIVIDUAL_MARKERS = 50  # larger batches are drawn as a marker cluster
+MAX_TABLE_ROWS = 1000  # rows shown in the batch table unless "Show all" is checked
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Pooled keep-alive HTTP session shared across Streamlit reruns"""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=8,
+        # raise_on_status=False returns the last error response, so callers still show the API's detail
+        max_retries=Retry(
+            total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504], raise_on_status=False
+        )
+    ))
+    return session
 
 def main():
     st.title("Location Intelligence Dashboard")
@@ -50,12 +71,14 @@ def main():
     elif tool == "Batch Geocoding":
         batch_geocoding_tool()
 
+@st.cache_data(ttl=15, show_spinner=False)
 def test_api_connection():
-    """Test if the API is running"""
+    """Test if the API is running (cached briefly so reruns don't re-probe)"""
     try:
-        response = requests.get(f"{API_BASE_URL}/health", timeout=2)
+        # Short connect/read timeouts so a stopped API fails fast
+        response = requests.get(f"{API_BASE_URL}/health", timeout=(0.5, 1.0))
         return response.status_code == 200
-    except:
+    except requests.exceptions.RequestException:
         return False
 
 def geocoding_tool():
@@ -188,7 +211,7 @@ def batch_geocoding_tool():
             try:
                 df = pd.read_csv(uploaded_file)
                 if 'address' in df.columns:
-                    addresses = df['address'].dropna().tolist()
+                    addresses = df['address'].dropna().astype(str).tolist()
                     st.success(f"Loaded {len(addresses)} addresses from CSV")
                 else:
                     st.error("CSV must have an 'address' column")
@@ -209,14 +232,14 @@ def batch_geocoding_tool():
 def geocode_address(address: str, country: str = "USA") -> Optional[Dict]:
     """Geocode a single address"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{API_BASE_URL}/geocode",
             params={"address": address, "country": country},
             timeout=10
         )
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             return {
                 'address': address,
                 'location': data["location"],
@@ -236,7 +259,7 @@ def search_places(lat: float, lon: float, service_type: str, radius: float, limi
     try:
         st.info(f"Searching for {service_type} near ({lat:.4f}, {lon:.4f}) within {radius} miles...")
         
-        response = requests.get(
+        response = get_session().get(
             f"{API_BASE_URL}/services/nearest",
             params={
                 "lat": lat,
@@ -251,7 +274,7 @@ def search_places(lat: float, lon: float, service_type: str, radius: float, limi
         st.info(f"API Response: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             places = data.get("nearest_services", [])
             
             return {
@@ -271,25 +294,56 @@ def search_places(lat: float, lon: float, service_type: str, radius: float, limi
         st.error(f"Network error during place search: {str(e)}")
         return None
 
+def normalize_address(address: str) -> str:
+    """Key that treats case and whitespace variants of an address as the same"""
+    return " ".join(address.lower().split())
+
 def batch_geocode(addresses: List[str]) -> Optional[Dict]:
-    """Batch geocode multiple addresses"""
+    """Batch geocode multiple addresses, sending each distinct address only once"""
+    # Map every normalized address to its position in the deduplicated list
+    unique, positions = [], {}
+    for address in addresses:
+        key = normalize_address(address)
+        if key not in positions:
+            positions[key] = len(unique)
+            unique.append(address)
+    
     try:
-        response = requests.post(
-            f"{API_BASE_URL}/batch/geocode",
-            json=addresses,
-            timeout=30
-        )
+        # The stream endpoint sends one NDJSON line per address as it completes;
+        # the read timeout applies between lines, not to the whole batch
+        with get_session().post(
+            f"{API_BASE_URL}/batch/geocode/stream",
+            json={"addresses": unique},
+            stream=True,
+            timeout=(5, 60)
+        ) as response:
+            if response.status_code != 200:
+                st.error(f"Batch geocoding failed: {response.json().get('detail', 'Unknown error')}")
+                return None
+            
+            unique_results = [None] * len(unique)
+            completed = 0
+            progress = st.progress(0.0, text=f"Geocoded 0/{len(unique)} addresses")
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                item = orjson.loads(line)
+                unique_results[item["index"]] = item["result"]
+                completed += 1
+                progress.progress(completed / len(unique), text=f"Geocoded {completed}/{len(unique)} addresses")
+            progress.empty()
         
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                'addresses': addresses,
-                'results': data["results"],
-                'total_processed': len(data["results"])
-            }
-        else:
-            st.error(f"Batch geocoding failed: {response.json().get('detail', 'Unknown error')}")
+        if completed < len(unique):
+            st.error(f"Batch geocoding stopped early: {completed} of {len(unique)} addresses returned")
             return None
+        
+        # Expand back to one result per submitted address
+        results = [unique_results[positions[normalize_address(a)]] for a in addresses]
+        return {
+            'addresses': addresses,
+            'results': results,
+            'total_processed': len(results)
+        }
             
     except requests.exceptions.RequestException as e:
         st.error(f"Network error during batch geocoding: {str(e)}")
@@ -364,22 +418,29 @@ def display_batch_results(results: Dict):
     
     st.success(f"Processed {results['total_processed']} addresses")
     
-    # Create results DataFrame
-    processed_data = []
-    for i, result in enumerate(results['results']):
-        processed_data.append({
-            'Original Address': results['addresses'][i] if i < len(results['addresses']) else 'N/A',
-            'Matched Address': result['location']['address'],
-            'Latitude': result['location']['latitude'],
-            'Longitude': result['location']['longitude'],
-            'Confidence': result['confidence'],
-            'Match Type': result['match_type']
-        })
+    # The backend returns exactly one result per address; check that once up front
+    rows = results['results']
+    n = len(rows)
+    if len(results['addresses']) != n:
+        st.error(f"Backend returned {n} results for {len(results['addresses'])} addresses")
+        return
     
-    df = pd.DataFrame(processed_data)
+    # Create results DataFrame column by column
+    df = pd.DataFrame({
+        'Original Address': results['addresses'],
+        'Matched Address': [r['location']['address'] for r in rows],
+        'Latitude': np.fromiter((r['location']['latitude'] for r in rows), dtype=np.float64, count=n),
+        'Longitude': np.fromiter((r['location']['longitude'] for r in rows), dtype=np.float64, count=n),
+        'Confidence': np.fromiter((r['confidence'] for r in rows), dtype=np.float64, count=n),
+        'Match Type': [r['match_type'] for r in rows]
+    })
     
     # Display results table
-    st.dataframe(df, use_container_width=True)
+    if len(df) > MAX_TABLE_ROWS and not st.checkbox(f"Show all {len(df)} rows"):
+        st.caption(f"Showing the first {MAX_TABLE_ROWS} rows")
+        st.dataframe(df.head(MAX_TABLE_ROWS), use_container_width=True)
+    else:
+        st.dataframe(df, use_container_width=True)
     
     # Download button
     csv = df.to_csv(index=False)
@@ -400,10 +461,9 @@ def display_batch_results(results: Dict):
         st.session_state.batch_results = None
         st.rerun()
 
-def create_single_point_map(lat: float, lon: float, title: str, popup_text: str):
-    """Create a map with a single point"""
-    st.subheader("Map View")
-    
+@st.cache_resource(max_entries=16)
+def _build_single_point_map(lat: float, lon: float, title: str, popup_text: str) -> folium.Map:
+    """Build (once per distinct input) a map with a single point"""
     # Create map centered on the point
     m = folium.Map(location=[lat, lon], zoom_start=12)
     
@@ -414,14 +474,14 @@ def create_single_point_map(lat: float, lon: float, title: str, popup_text: str)
         tooltip=title,
         icon=folium.Icon(color='red', icon='info-sign')
     ).add_to(m)
-    
-    # Display map
-    st_folium(m, width=700, height=400)
+    return m
 
-def create_places_map(center_lat: float, center_lon: float, places: List[Dict], service_type: str):
-    """Create a map showing search center and found places"""
-    st.subheader("Map View")
+@st.cache_resource(max_entries=16)
+def _build_places_map(center_lat: float, center_lon: float, places: tuple, service_type: str) -> folium.Map:
+    """Build (once per distinct input) a map of the search center and found places
     
+    places holds (latitude, longitude, name, address, distance_miles, confidence) tuples.
+    """
     # Create map centered on search location
     m = folium.Map(location=[center_lat, center_lon], zoom_start=12)
     
@@ -433,54 +493,96 @@ def create_places_map(center_lat: float, center_lon: float, places: List[Dict],
         icon=folium.Icon(color='blue', icon='crosshairs')
     ).add_to(m)
     
+    # Precompute marker text so the loop below only adds markers
+    popups = [
+        f"<b>{name}</b><br>{address}<br>Distance: {distance_miles} mi<br>Confidence: {confidence}"
+        for _, _, name, address, distance_miles, confidence in places
+    ]
+    label = service_type.title()
+    icon_name = 'plus' if service_type == 'hospital' else 'info-sign'
+    
     # Add found places
-    for i, place in enumerate(places):
+    for i, (place, popup) in enumerate(zip(places, popups)):
         folium.Marker(
-            [place['latitude'], place['longitude']],
-            popup=f"<b>{place['name']}</b><br>{place['address']}<br>Distance: {place['distance_miles']} mi<br>Confidence: {place['confidence']}",
-            tooltip=f"{service_type.title()} #{i+1}",
-            icon=folium.Icon(color='green', icon='plus' if service_type == 'hospital' else 'info-sign')
+            [place[0], place[1]],
+            popup=popup,
+            tooltip=f"{label} #{i+1}",
+            icon=folium.Icon(color='green', icon=icon_name)
         ).add_to(m)
-    
-    # Display map
-    st_folium(m, width=700, height=400)
+    return m
 
-def create_batch_map(results: List[Dict]):
-    """Create a map with multiple geocoded points"""
-    st.subheader("Batch Results Map")
-    
-    if not results:
-        return
+@st.cache_resource(max_entries=16)
+def _build_batch_map(points: tuple) -> folium.Map:
+    """Build (once per distinct input) a map of geocoded batch points
     
-    # Calculate center point
-    center_lat = sum(r['location']['latitude'] for r in results) / len(results)
-    center_lon = sum(r['location']['longitude'] for r in results) / len(results)
+    points holds (latitude, longitude, address, confidence, match_type) tuples.
+    """
+    # Coordinates as an (N, 2) lat/lon array for center and bounds
+    coords = np.array([p[:2] for p in points], dtype=np.float64)
+    center_lat, center_lon = coords.mean(axis=0)
     
-    # Create map
+    # Create map, zoomed to fit every point
     m = folium.Map(location=[center_lat, center_lon], zoom_start=6)
+    if len(coords) > 1:
+        m.fit_bounds([coords.min(axis=0).tolist(), coords.max(axis=0).tolist()])
+    
+    # Large batches are clustered client-side instead of one Marker each
+    if len(points) >= MAX_INDIVIDUAL_MARKERS:
+        FastMarkerCluster(data=coords.tolist()).add_to(m)
+        return m
+    
+    # Precompute marker text and colors (by confidence) so the loop below only adds markers
+    popups = [
+        f"<b>{address}</b><br>Confidence: {confidence}%<br>Type: {match_type}"
+        for _, _, address, confidence, match_type in points
+    ]
+    colors = ['green' if p[3] >= 90 else 'orange' if p[3] >= 70 else 'red' for p in points]
     
     # Add markers for each result
-    for i, result in enumerate(results):
-        lat = result['location']['latitude']
-        lon = result['location']['longitude']
-        
-        # Color based on confidence
-        if result['confidence'] >= 90:
-            color = 'green'
-        elif result['confidence'] >= 70:
-            color = 'orange'
-        else:
-            color = 'red'
-        
+    for i, (row, popup, color) in enumerate(zip(coords.tolist(), popups, colors)):
         folium.Marker(
-            [lat, lon],
-            popup=f"<b>{result['location']['address']}</b><br>Confidence: {result['confidence']}%<br>Type: {result['match_type']}",
+            row,
+            popup=popup,
             tooltip=f"Point {i+1}",
             icon=folium.Icon(color=color, icon='info-sign')
         ).add_to(m)
+    return m
+
+def create_single_point_map(lat: float, lon: float, title: str, popup_text: str):
+    """Create a map with a single point"""
+    st.subheader("Map View")
+    
+    # Display-only map; returning no state keeps pans and zooms from triggering reruns
+    st_folium(_build_single_point_map(lat, lon, title, popup_text), width=700, height=400, returned_objects=[])
+
+def create_places_map(center_lat: float, center_lon: float, places: List[Dict], service_type: str):
+    """Create a map showing search center and found places"""
+    st.subheader("Map View")
+    
+    # Hashable snapshot of the fields the map shows, used as the cache key
+    points = tuple(
+        (p['latitude'], p['longitude'], p['name'], p['address'], p['distance_miles'], p['confidence'])
+        for p in places
+    )
+    
+    # Display-only map; returning no state keeps pans and zooms from triggering reruns
+    st_folium(_build_places_map(center_lat, center_lon, points, service_type), width=700, height=400, returned_objects=[])
+
+def create_batch_map(results: List[Dict]):
+    """Create a map with multiple geocoded points"""
+    st.subheader("Batch Results Map")
+    
+    if not results:
+        return
+    
+    # Hashable snapshot of the fields the map shows, used as the cache key
+    points = tuple(
+        (r['location']['latitude'], r['location']['longitude'], r['location']['address'], r['confidence'], r['match_type'])
+        for r in results
+    )
     
-    # Display map
-    st_folium(m, width=700, height=400)
+    # Display-only map; returning no state keeps pans and zooms from triggering reruns
+    st_folium(_build_batch_map(points), width=700, height=400, returned_objects=[])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file